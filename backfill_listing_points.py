@@ -0,0 +1,28 @@
+"""
+One-time backfill of Listing location.point
+
+Listings written before the GeoJSON point existed are invisible to geo
+searches on GET /listings. Run once after deploying:
+
+    python backfill_listing_points.py
+"""
+
+import asyncio
+
+from database import db
+
+
+async def main():
+    if db is None:
+        raise SystemExit("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    # Pipeline update: computed server-side in a single round-trip
+    result = await db.listing.update_many(
+        {"location.point": {"$exists": False}, "location.lat": {"$exists": True}, "location.lng": {"$exists": True}},
+        [{"$set": {"location.point": {"type": "Point", "coordinates": ["$location.lng", "$location.lat"]}}}],
+    )
+    print(f"Backfilled location.point on {result.modified_count} listings")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
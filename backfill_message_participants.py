@@ -0,0 +1,28 @@
+"""
+One-time backfill of Message.participants
+
+Messages written before the participants field existed are invisible to
+GET /messages?user_id=... Run once after deploying:
+
+    python backfill_message_participants.py
+"""
+
+import asyncio
+
+from database import db
+
+
+async def main():
+    if db is None:
+        raise SystemExit("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    # Pipeline update: computed server-side in a single round-trip
+    result = await db.message.update_many(
+        {"participants": {"$exists": False}},
+        [{"$set": {"participants": ["$sender_id", "$receiver_id"]}}],
+    )
+    print(f"Backfilled participants on {result.modified_count} messages")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Redis Result Cache
+
+Short-TTL cache for read-heavy list endpoints. Cached responses are stored as
+pre-serialized JSON, so a hit skips both Mongo and response encoding.
+Caching is disabled (handlers run uncached) when REDIS_URL is not set.
+
+Keys embed a per-namespace generation counter; invalidating a namespace just
+bumps the counter and stale entries age out with their TTL.
+"""
+
+import functools
+import json
+from typing import Callable, Optional
+
+import orjson
+from fastapi import Response
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config import get_settings
+
+redis = None
+
+redis_url = get_settings().redis_url
+
+if redis_url:
+    redis = Redis.from_url(redis_url)
+
+
+def _default_key(**kwargs) -> str:
+    return json.dumps(kwargs, sort_keys=True)
+
+
+def cached(namespace: str, key: Optional[Callable[..., str]] = None, ttl: int = 60):
+    """Cache an async endpoint's result under namespace + key(**kwargs) for ttl seconds"""
+    key = key or _default_key
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            if redis is None:
+                return await func(**kwargs)
+
+            try:
+                gen = await redis.get(f"{namespace}:gen") or b"0"
+                cache_key = f"{namespace}:{gen.decode()}:{key(**kwargs)}"
+                hit = await redis.get(cache_key)
+            except RedisError:
+                return await func(**kwargs)
+            if hit is not None:
+                return Response(content=hit, media_type="application/json")
+
+            result = await func(**kwargs)
+            # Store an already-rendered response body as-is
+            body = result.body if isinstance(result, Response) else orjson.dumps(result)
+            try:
+                await redis.set(cache_key, body, ex=ttl)
+            except RedisError:
+                pass
+            return result
+        return wrapper
+    return decorator
+
+
+async def invalidate(namespace: str):
+    """Orphan every cached entry in namespace with a single O(1) INCR"""
+    if redis is None:
+        return
+    try:
+        await redis.incr(f"{namespace}:gen")
+    except RedisError:
+        pass
@@ -0,0 +1,25 @@
+"""
+Application Settings
+
+Environment (and .env) values are read once into a frozen Settings object.
+Call get_settings() instead of os.getenv so lookups hit the cached instance.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    database_url: Optional[str] = None
+    database_name: Optional[str] = None
+    redis_url: Optional[str] = None
+    cors_origins: str = "https://rentit.app,https://admin.rentit.app"
+
+    model_config = SettingsConfigDict(env_file=".env", frozen=True, extra="ignore")
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
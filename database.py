@@ -3,53 +3,271 @@ Database Helper Functions
 
 MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
+
+All helpers are coroutines backed by Motor, so await them from `async def`
+endpoints instead of tying up the threadpool with blocking PyMongo calls.
 """
 
-from pymongo import MongoClient
+from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
 from datetime import datetime, timezone
-import os
-from dotenv import load_dotenv
-from typing import Union
+from typing import Union, Optional, Dict, Any, List
 from pydantic import BaseModel
 
-# Load environment variables from .env file
-load_dotenv()
+from config import get_settings
+
+# A collection name, or a collection object bound once at import time
+CollectionRef = Union[str, AsyncIOMotorCollection]
+
+
+class _ObjectIdAsStr(TypeDecoder):
+    bson_type = ObjectId
+
+    def transform_bson(self, value):
+        return str(value)
+
+
+# ObjectIds are decoded straight to str, so documents read back are JSON-ready.
+# Wrap ids in ObjectId(...) again when using them in a filter. Datetimes come
+# back UTC-aware so every serializer emits the same +00:00 offset.
+CODEC_OPTIONS = CodecOptions(
+    tz_aware=True,
+    tzinfo=timezone.utc,
+    type_registry=TypeRegistry([_ObjectIdAsStr()]),
+)
 
 _client = None
 db = None
 
-database_url = os.getenv("DATABASE_URL")
-database_name = os.getenv("DATABASE_NAME")
+database_url = get_settings().database_url
+database_name = get_settings().database_name
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+    # Pool limits are per process: running uvicorn with --workers N opens up to
+    # N * maxPoolSize connections against the cluster.
+    _client = AsyncIOMotorClient(
+        database_url,
+        maxPoolSize=200,
+        minPoolSize=20,
+        maxIdleTimeMS=60000,
+        serverSelectionTimeoutMS=3000,
+        retryWrites=True,
+        # zstd when the server supports it, zlib (no extra dependency) otherwise
+        compressors="zstd,zlib",
+        zlibCompressionLevel=-1,
+    )
+    db = _client.get_database(database_name, codec_options=CODEC_OPTIONS)
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
+def _ensure_db():
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
+
+def _collection(collection: CollectionRef) -> AsyncIOMotorCollection:
+    # Accept a pre-bound collection to skip the per-call db[name] lookup
+    return db[collection] if isinstance(collection, str) else collection
+
+
+async def create_document(collection: CollectionRef, data: Union[BaseModel, dict], copy: bool = True):
+    """Insert a single document with timestamp.
+
+    Pass copy=False when the dict was built for this call and may be mutated
+    (timestamps and _id are added in place).
+    """
+    _ensure_db()
+
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
         data_dict = data.model_dump()
-    else:
+    elif copy:
         data_dict = data.copy()
+    else:
+        data_dict = data
 
-    data_dict['created_at'] = datetime.now(timezone.utc)
-    data_dict['updated_at'] = datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc)
+    data_dict['created_at'] = now
+    data_dict['updated_at'] = now
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await _collection(collection).insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+
+async def create_documents(collection: CollectionRef, docs: List[Union[BaseModel, dict]], copy: bool = True) -> List[str]:
+    """Insert many documents in one round-trip with timestamps.
+
+    Uses ordered=False so the server keeps inserting past a failing document;
+    any failures are reported together as a BulkWriteError once the batch
+    finishes. Pass copy=False to stamp freshly built dicts in place.
+    """
+    _ensure_db()
+    if not docs:
+        return []
+
+    now = datetime.now(timezone.utc)
+    dicts = []
+    for d in docs:
+        if isinstance(d, BaseModel):
+            d = d.model_dump()
+        elif copy:
+            d = d.copy()
+        d['created_at'] = now
+        d['updated_at'] = now
+        dicts.append(d)
+
+    result = await _collection(collection).insert_many(dicts, ordered=False)
+    return [str(x) for x in result.inserted_ids]
+
+
+async def bulk_write(collection: CollectionRef, operations: list, ordered: bool = False):
+    """Run mixed InsertOne/UpdateOne/DeleteOne operations in one round-trip"""
+    _ensure_db()
+    result = await _collection(collection).bulk_write(operations, ordered=ordered)
+    return {
+        "inserted": result.inserted_count,
+        "matched": result.matched_count,
+        "modified": result.modified_count,
+        "deleted": result.deleted_count,
+        "upserted_ids": {i: str(v) for i, v in result.upserted_ids.items()},
+    }
+
+
+# skip/limit paging needs a stable order; _id is unique and always indexed
+DEFAULT_SORT = [("_id", 1)]
+
+
+# Field added to each result with its distance in metres from a $nearSphere point
+DISTANCE_FIELD = "distance_m"
+
+
+def _split_near(filter_dict: dict):
+    """Pull a $nearSphere condition out of a filter as (key, near, rest)"""
+    for key, cond in (filter_dict or {}).items():
+        if isinstance(cond, dict) and "$nearSphere" in cond:
+            rest = {k: v for k, v in filter_dict.items() if k != key}
+            return key, cond["$nearSphere"], rest
+    return None, None, filter_dict or {}
+
+
+def _id_pipeline(filter_dict: dict, limit: int, skip: int, projection: dict, sort: list) -> list:
+    # $match (or $geoNear) stays first so indexes still apply; the id is
+    # computed only for the documents that survive paging
+    key, near, query = _split_near(filter_dict)
+    if near is None:
+        pipeline = [{"$match": query}]
+    else:
+        # $nearSphere is rejected inside $match; $geoNear keeps both the
+        # 2dsphere index and nearest-first order
+        geo_near = {
+            "near": near["$geometry"],
+            "key": key,
+            "distanceField": DISTANCE_FIELD,
+            "spherical": True,
+            "query": query,
+        }
+        if "$maxDistance" in near:
+            geo_near["maxDistance"] = near["$maxDistance"]
+        pipeline = [{"$geoNear": geo_near}]
+        sort = sort or [(DISTANCE_FIELD, 1), ("_id", 1)]
+    pipeline.append({"$sort": dict(sort or DEFAULT_SORT)})
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit:
+        pipeline.append({"$limit": limit})
+    project = {**(projection or {}), "_id": 0}
+    if any(project.values()):
+        # Inclusion projection: keep the computed id alongside the listed fields
+        project["id"] = 1
+    pipeline.append({"$addFields": {"id": {"$toString": "$_id"}}})
+    pipeline.append({"$project": project})
+    return pipeline
+
+
+def find_documents(
+    collection: CollectionRef,
+    filter_dict: dict = None,
+    limit: int = None,
+    skip: int = 0,
+    projection: dict = None,
+    sort: list = None,
+    batch_size: int = 500,
+    use_aggregate: bool = False,
+):
+    """Build a paged, projected cursor to iterate with `async for`.
+
+    Results are ordered by `sort`, falling back to _id so skip/limit pages
+    don't overlap or leave gaps.
+
+    With use_aggregate=True the query runs as a pipeline that returns each
+    document with a string `id` in place of `_id`, computed by the server.
+    A $nearSphere condition becomes a leading $geoNear stage, which also adds
+    each result's distance in metres as `distance_m`.
+    """
+    _ensure_db()
+    if use_aggregate:
+        pipeline = _id_pipeline(filter_dict, limit, skip, projection, sort)
+        return _collection(collection).aggregate(pipeline, batchSize=batch_size)
+    cursor = _collection(collection).find(filter_dict or {}, projection, batch_size=batch_size)
+    # $nearSphere already orders by distance; a default sort would override it
+    if sort or _split_near(filter_dict)[1] is None:
+        cursor = cursor.sort(sort or DEFAULT_SORT)
+    if skip:
+        cursor = cursor.skip(skip)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+    return cursor
+
+
+async def get_documents(
+    collection: CollectionRef,
+    filter_dict: dict = None,
+    limit: int = None,
+    skip: int = 0,
+    projection: dict = None,
+    sort: list = None,
+    use_aggregate: bool = False,
+):
+    """Get documents from collection, paged and projected server-side"""
+    cursor = find_documents(collection, filter_dict, limit, skip, projection, sort, use_aggregate=use_aggregate)
+    return await cursor.to_list(length=limit)
+
+
+async def get_document(collection: CollectionRef, filter_dict: dict) -> Optional[Dict[str, Any]]:
+    """Get a single document by filter"""
+    _ensure_db()
+    return await _collection(collection).find_one(filter_dict or {})
+
+
+async def update_document(collection: CollectionRef, filter_dict: dict, update_dict: dict, upsert: bool = False):
+    """Update a document and set updated_at. Optionally upsert."""
+    _ensure_db()
+    update = {
+        "$set": {**update_dict, "updated_at": datetime.now(timezone.utc)}
+    }
+    result = await _collection(collection).update_one(filter_dict or {}, update, upsert=upsert)
+    return {
+        "matched": result.matched_count,
+        "modified": result.modified_count,
+        "upserted_id": str(result.upserted_id) if result.upserted_id else None,
+    }
+
+
+async def update_documents(collection: CollectionRef, filter_dict: dict, update_dict: dict = None, inc_dict: dict = None):
+    """Update every matching document in one round-trip and set updated_at.
+
+    update_many is atomic per document only; a failure part-way through can
+    leave some matches updated. Use inc_dict for counters so the increment is
+    applied server-side instead of read-modify-write.
+    """
+    _ensure_db()
+    update = {
+        "$set": {**(update_dict or {}), "updated_at": datetime.now(timezone.utc)}
+    }
+    if inc_dict:
+        update["$inc"] = inc_dict
+    result = await _collection(collection).update_many(filter_dict or {}, update)
+    return {
+        "matched": result.matched_count,
+        "modified": result.modified_count,
+    }
@@ -1,23 +1,60 @@
+import logging
 import os
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
 
-from fastapi import FastAPI, HTTPException
+import orjson
+from bson import ObjectId
+from fastapi import Body, Depends, FastAPI, HTTPException, Query
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-from database import db, create_document, get_documents
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError
+
+from cache import cached, invalidate
+from config import Settings, get_settings
+from database import db, create_document, create_documents, find_documents, get_documents, update_documents
 from schemas import User, Listing, Booking, Message, Review, SavedSearch, VerificationRequest
 
-app = FastAPI(title="Rent It API", description="Backend for Rent It platform")
+logger = logging.getLogger(__name__)
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_UUID | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+
+def _orjson_default(obj: Any):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also encodes ObjectId and treats naive datetimes as UTC"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=ORJSON_OPTIONS)
+
+
+app = FastAPI(
+    title="Rent It API",
+    description="Backend for Rent It platform",
+    default_response_class=MongoJSONResponse,
+)
+
+# Explicit lists let Starlette answer preflights from a static header set
+CORS_ORIGINS = [o.strip() for o in get_settings().cors_origins.split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 
 # -----------------------------
@@ -28,6 +65,122 @@ def collection_name(model_cls) -> str:
     return model_cls.__name__.lower()
 
 
+def _bind(model_cls):
+    return db[collection_name(model_cls)] if db is not None else None
+
+
+# Collections are resolved once here instead of on every request
+USER_COLL = _bind(User)
+LISTING_COLL = _bind(Listing)
+BOOKING_COLL = _bind(Booking)
+MESSAGE_COLL = _bind(Message)
+REVIEW_COLL = _bind(Review)
+SAVED_SEARCH_COLL = _bind(SavedSearch)
+VERIFICATION_COLL = _bind(VerificationRequest)
+
+
+# Bulk payloads are validated in one call against these prebuilt list validators
+USER_LIST_ADAPTER = TypeAdapter(List[User])
+LISTING_LIST_ADAPTER = TypeAdapter(List[Listing])
+REVIEW_LIST_ADAPTER = TypeAdapter(List[Review])
+
+
+def validate_bulk(adapter: TypeAdapter, raw: list) -> list:
+    """Validate and JSON-dump a bulk payload, surfacing errors as a normal 422"""
+    try:
+        items = adapter.validate_python(raw)
+    except ValidationError as e:
+        # Match FastAPI's own body errors, e.g. ["body", 0, "title"]
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors()])
+    return adapter.dump_python(items, mode="json")
+
+
+def bulk_openapi(adapter: TypeAdapter) -> dict:
+    """openapi_extra restoring the item schema lost by typing the body as a plain list"""
+    schema = adapter.json_schema(ref_template="#/components/schemas/{model}")
+    # The referenced models are already registered by the single-item endpoints
+    schema.pop("$defs", None)
+    return {"requestBody": {"content": {"application/json": {"schema": schema}}}}
+
+
+async def insert_bulk(collection, docs: list) -> MongoJSONResponse:
+    """Insert a validated batch, reporting partial failures as a 207"""
+    try:
+        ids = await create_documents(collection, docs, copy=False)
+    except BulkWriteError as e:
+        # Unordered: everything except the failed indexes was written.
+        # insert_many assigned _id to each dict in place.
+        errors = e.details.get("writeErrors", [])
+        failed = {err["index"] for err in errors}
+        return MongoJSONResponse(
+            {
+                "inserted": e.details.get("nInserted", 0),
+                "ids": [str(d["_id"]) for i, d in enumerate(docs) if i not in failed],
+                "errors": [
+                    {"index": err["index"], "code": err.get("code"), "message": err.get("errmsg")}
+                    for err in errors
+                ],
+            },
+            status_code=207,
+        )
+    return MongoJSONResponse(ids, status_code=201)
+
+
+# Heavy fields left out of list responses; fetch the single document for them
+LIST_PROJECTION = {"description": 0, "photos": 0}
+
+
+async def stream_page(first: Optional[dict], cursor, skip: int):
+    """Encode a cursor as {"items": [...], "next_skip": n} one document at a time"""
+    yield b'{"items":['
+    n = 0
+    if first is not None:
+        yield orjson.dumps(first, default=_orjson_default, option=ORJSON_OPTIONS)
+        n = 1
+        async for doc in cursor:
+            yield b"," + orjson.dumps(doc, default=_orjson_default, option=ORJSON_OPTIONS)
+            n += 1
+    yield b'],"next_skip":' + str(skip + n).encode() + b"}"
+
+
+async def streamed_page(cursor, skip: int) -> StreamingResponse:
+    # Pull the first document before the 200 goes out, so query errors and
+    # timeouts still surface as a 500. With limit <= batch_size this fetches
+    # the whole page, leaving only encoding to the stream.
+    try:
+        first = await cursor.next()
+    except StopAsyncIteration:
+        first = None
+    return StreamingResponse(stream_page(first, cursor, skip), media_type="application/json")
+
+
+@app.on_event("startup")
+async def warm_pool():
+    # Forces server selection so the first request doesn't pay the handshake
+    if db is None:
+        return
+    try:
+        await db.command("ping")
+    except Exception:
+        logger.exception("Mongo ping failed at startup; /readyz will report it")
+
+
+@app.on_event("startup")
+async def create_indexes():
+    if db is None:
+        return
+    # Like warm_pool, a Mongo outage must not stop the app from booting
+    try:
+        await LISTING_COLL.create_index([("price", 1), ("room_type", 1), ("available_now", 1)])
+        await LISTING_COLL.create_index([("location.point", "2dsphere")])
+        await MESSAGE_COLL.create_index([("listing_id", 1), ("participants", 1)])
+        await MESSAGE_COLL.create_index([("participants", 1)])
+        await BOOKING_COLL.create_index([("tenant_id", 1)])
+        await BOOKING_COLL.create_index([("landlord_id", 1)])
+    except Exception:
+        logger.exception("Index creation failed; will retry on next startup")
+
+
 # -----------------------------
 # Health & Schema
 # -----------------------------
@@ -43,8 +196,38 @@ def get_schema():
     return {"status": "ok"}
 
 
+@app.get("/healthz")
+def healthz():
+    # Liveness: no database round-trip, safe to poll frequently
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    try:
+        await db.command("ping")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database ping failed: {str(e)[:80]}")
+    return {"status": "ok"}
+
+
+# listCollections is an admin round-trip; /test diagnostics reuse it for a minute
+COLLECTIONS_TTL = 60.0
+_collections_cache = {"expires": 0.0, "names": []}
+
+
+async def _collection_names() -> list:
+    now = time.monotonic()
+    if now >= _collections_cache["expires"]:
+        _collections_cache["names"] = await db.list_collection_names()
+        _collections_cache["expires"] = now + COLLECTIONS_TTL
+    return _collections_cache["names"]
+
+
 @app.get("/test")
-def test_database():
+async def test_database(settings: Settings = Depends(get_settings)):
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -57,11 +240,11 @@ def test_database():
     try:
         if db is not None:
             response["database"] = "✅ Available"
-            response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-            response["database_name"] = os.getenv("DATABASE_NAME") or "Unknown"
+            response["database_url"] = "✅ Set" if settings.database_url else "❌ Not Set"
+            response["database_name"] = settings.database_name or "Unknown"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await _collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -89,12 +272,12 @@ class AuthSyncPayload(BaseModel):
 
 
 @app.post("/auth/sync")
-def auth_sync(payload: AuthSyncPayload):
+async def auth_sync(payload: AuthSyncPayload):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not available")
 
-    coll = db[collection_name(User)]
-    existing = coll.find_one({"supabase_user_id": payload.supabase_user_id})
+    coll = USER_COLL
+    existing = await coll.find_one({"supabase_user_id": payload.supabase_user_id})
 
     user_doc = {
         "name": payload.name,
@@ -109,39 +292,49 @@ def auth_sync(payload: AuthSyncPayload):
     }
 
     if existing:
-        coll.update_one({"_id": existing["_id"]}, {"$set": user_doc})
-        user_id = str(existing["_id"])
+        # _id decodes as a string; filters still need the ObjectId
+        oid = ObjectId(existing["_id"])
+        await coll.update_one({"_id": oid}, {"$set": user_doc})
     else:
         # insert new
         user_doc["created_at"] = datetime.utcnow()
-        res = coll.insert_one(user_doc)
-        user_id = str(res.inserted_id)
+        res = await coll.insert_one(user_doc)
+        oid = res.inserted_id
 
-    doc = coll.find_one({"_id": res.inserted_id}) if not existing else coll.find_one({"_id": existing["_id"]})
+    doc = await coll.find_one({"_id": oid})
     if not doc:
         raise HTTPException(status_code=500, detail="Failed to create or fetch user")
 
-    doc["id"] = str(doc.pop("_id"))
-    return doc
+    doc["id"] = doc.pop("_id")
+    return MongoJSONResponse(doc)
 
 
 @app.get("/users")
-def list_users(role: Optional[str] = None, supabase_user_id: Optional[str] = None):
+async def list_users(
+    role: Optional[str] = None,
+    supabase_user_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0),
+):
     filt = {}
     if role:
         filt["role"] = role
     if supabase_user_id:
         filt["supabase_user_id"] = supabase_user_id
-    docs = get_documents(collection_name(User), filt)
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-    return docs
+    cursor = find_documents(USER_COLL, filt, limit=limit, skip=skip, use_aggregate=True)
+    return await streamed_page(cursor, skip)
 
 
 @app.post("/users", status_code=201)
-def create_user(user: User):
-    user_id = create_document(collection_name(User), user)
-    return {"id": user_id, **user.model_dump()}
+async def create_user(user: User):
+    data = user.model_dump(mode="json")
+    user_id = await create_document(USER_COLL, data)
+    return MongoJSONResponse({"id": user_id, **data}, status_code=201)
+
+
+@app.post("/users:bulk", status_code=201, openapi_extra=bulk_openapi(USER_LIST_ADAPTER))
+async def create_users_bulk(raw: list = Body(...)):
+    return await insert_bulk(USER_COLL, validate_bulk(USER_LIST_ADAPTER, raw))
 
 
 # -----------------------------
@@ -149,40 +342,85 @@ def create_user(user: User):
 # -----------------------------
 
 @app.post("/listings", status_code=201)
-def create_listing(listing: Listing):
-    listing_id = create_document(collection_name(Listing), listing)
-    return {"id": listing_id, **listing.model_dump()}
+async def create_listing(listing: Listing):
+    data = listing.model_dump(mode="json")
+    listing_id = await create_document(LISTING_COLL, data)
+    await invalidate("listings")
+    return MongoJSONResponse({"id": listing_id, **data}, status_code=201)
+
+
+@app.post("/listings:bulk", status_code=201, openapi_extra=bulk_openapi(LISTING_LIST_ADAPTER))
+async def create_listings_bulk(raw: list = Body(...)):
+    # Single unordered insert_many: one bad document doesn't abort the rest
+    response = await insert_bulk(LISTING_COLL, validate_bulk(LISTING_LIST_ADAPTER, raw))
+    await invalidate("listings")
+    return response
+
+
+# search_listings filter builders, specialised once per combination of
+# supplied params so the handler only picks one and calls it
+_PRICE_MIN, _PRICE_MAX, _ROOM_TYPE, _AVAILABLE_NOW, _NEAR = 1, 2, 4, 8, 16
+
+
+def _listing_filter_builder(mask: int):
+    parts = []
+    if mask & _PRICE_MIN and mask & _PRICE_MAX:
+        parts.append(lambda p: ("price", {"$gte": p["price_min"], "$lte": p["price_max"]}))
+    elif mask & _PRICE_MIN:
+        parts.append(lambda p: ("price", {"$gte": p["price_min"]}))
+    elif mask & _PRICE_MAX:
+        parts.append(lambda p: ("price", {"$lte": p["price_max"]}))
+    if mask & _ROOM_TYPE:
+        parts.append(lambda p: ("room_type", p["room_type"]))
+    if mask & _AVAILABLE_NOW:
+        parts.append(lambda p: ("available_now", p["available_now"]))
+    if mask & _NEAR:
+        parts.append(lambda p: ("location.point", {
+            "$nearSphere": {
+                "$geometry": {"type": "Point", "coordinates": [p["lng"], p["lat"]]},
+                "$maxDistance": p["radius_km"] * 1000,
+            }
+        }))
+    return lambda p: dict(part(p) for part in parts)
+
+
+LISTING_FILTER_BUILDERS = {mask: _listing_filter_builder(mask) for mask in range(32)}
 
 
 @app.get("/listings")
-def search_listings(
-    lat: Optional[float] = None,
-    lng: Optional[float] = None,
-    radius_km: float = 20.0,
+@cached("listings")
+async def search_listings(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(20.0, gt=0),
     price_min: Optional[float] = None,
     price_max: Optional[float] = None,
     room_type: Optional[str] = None,
     available_now: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0),
 ):
-    # Basic filter (no geo index in this simple version)
-    filt = {}
-    if price_min is not None or price_max is not None:
-        filt["price"] = {}
-        if price_min is not None:
-            filt["price"]["$gte"] = price_min
-        if price_max is not None:
-            filt["price"]["$lte"] = price_max
-    if room_type:
-        filt["room_type"] = room_type
-    if available_now is not None:
-        filt["available_now"] = available_now
-
-    docs = get_documents(collection_name(Listing), filt)
-    results = []
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-        results.append(d)
-    return results
+    mask = (
+        (price_min is not None) * _PRICE_MIN
+        | (price_max is not None) * _PRICE_MAX
+        | bool(room_type) * _ROOM_TYPE
+        | (available_now is not None) * _AVAILABLE_NOW
+        | (lat is not None and lng is not None) * _NEAR
+    )
+    filt = LISTING_FILTER_BUILDERS[mask]({
+        "price_min": price_min,
+        "price_max": price_max,
+        "room_type": room_type,
+        "available_now": available_now,
+        "lat": lat,
+        "lng": lng,
+        "radius_km": radius_km,
+    })
+
+    docs = await get_documents(
+        LISTING_COLL, filt, limit=limit, skip=skip, projection=LIST_PROJECTION, use_aggregate=True
+    )
+    return MongoJSONResponse({"items": docs, "next_skip": skip + len(docs)})
 
 
 # -----------------------------
@@ -190,22 +428,26 @@ def search_listings(
 # -----------------------------
 
 @app.post("/bookings", status_code=201)
-def request_booking(booking: Booking):
-    booking_id = create_document(collection_name(Booking), booking)
-    return {"id": booking_id, **booking.model_dump()}
+async def request_booking(booking: Booking):
+    data = booking.model_dump(mode="json")
+    booking_id = await create_document(BOOKING_COLL, data)
+    return MongoJSONResponse({"id": booking_id, **data}, status_code=201)
 
 
 @app.get("/bookings")
-def list_bookings(tenant_id: Optional[str] = None, landlord_id: Optional[str] = None):
+async def list_bookings(
+    tenant_id: Optional[str] = None,
+    landlord_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0),
+):
     filt = {}
     if tenant_id:
         filt["tenant_id"] = tenant_id
     if landlord_id:
         filt["landlord_id"] = landlord_id
-    docs = get_documents(collection_name(Booking), filt)
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-    return docs
+    cursor = find_documents(BOOKING_COLL, filt, limit=limit, skip=skip, use_aggregate=True)
+    return await streamed_page(cursor, skip)
 
 
 # -----------------------------
@@ -213,22 +455,35 @@ def list_bookings(tenant_id: Optional[str] = None, landlord_id: Optional[str] =
 # -----------------------------
 
 @app.post("/messages", status_code=201)
-def send_message(msg: Message):
-    msg_id = create_document(collection_name(Message), msg)
-    return {"id": msg_id, **msg.model_dump()}
+async def send_message(msg: Message):
+    data = msg.model_dump(mode="json")
+    msg_id = await create_document(MESSAGE_COLL, data)
+    return MongoJSONResponse({"id": msg_id, **data}, status_code=201)
 
 
 @app.get("/messages")
-def get_messages(listing_id: Optional[str] = None, user_id: Optional[str] = None):
+async def get_messages(
+    listing_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0),
+):
     filt = {}
     if listing_id:
         filt["listing_id"] = listing_id
     if user_id:
-        filt["$or"] = [{"sender_id": user_id}, {"receiver_id": user_id}]
-    docs = get_documents(collection_name(Message), filt)
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-    return docs
+        filt["participants"] = user_id
+    cursor = find_documents(MESSAGE_COLL, filt, limit=limit, skip=skip, use_aggregate=True)
+    return await streamed_page(cursor, skip)
+
+
+@app.post("/messages/mark-read")
+async def mark_messages_read(user_id: str, listing_id: Optional[str] = None):
+    # participants is redundant with receiver_id but lets the multikey index narrow the match
+    filt = {"participants": user_id, "receiver_id": user_id, "read": False}
+    if listing_id:
+        filt["listing_id"] = listing_id
+    return await update_documents(MESSAGE_COLL, filt, {"read": True})
 
 
 # -----------------------------
@@ -236,18 +491,30 @@ def get_messages(listing_id: Optional[str] = None, user_id: Optional[str] = None
 # -----------------------------
 
 @app.post("/reviews", status_code=201)
-def create_review(review: Review):
-    review_id = create_document(collection_name(Review), review)
-    return {"id": review_id, **review.model_dump()}
+async def create_review(review: Review):
+    data = review.model_dump(mode="json")
+    review_id = await create_document(REVIEW_COLL, data)
+    await invalidate("reviews")
+    return MongoJSONResponse({"id": review_id, **data}, status_code=201)
+
+
+@app.post("/reviews:bulk", status_code=201, openapi_extra=bulk_openapi(REVIEW_LIST_ADAPTER))
+async def create_reviews_bulk(raw: list = Body(...)):
+    response = await insert_bulk(REVIEW_COLL, validate_bulk(REVIEW_LIST_ADAPTER, raw))
+    await invalidate("reviews")
+    return response
 
 
 @app.get("/reviews")
-def list_reviews(reviewee_id: Optional[str] = None):
+@cached("reviews")
+async def list_reviews(
+    reviewee_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0),
+):
     filt = {"reviewee_id": reviewee_id} if reviewee_id else {}
-    docs = get_documents(collection_name(Review), filt)
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-    return docs
+    docs = await get_documents(REVIEW_COLL, filt, limit=limit, skip=skip, use_aggregate=True)
+    return MongoJSONResponse({"items": docs, "next_skip": skip + len(docs)})
 
 
 # -----------------------------
@@ -255,17 +522,20 @@ def list_reviews(reviewee_id: Optional[str] = None):
 # -----------------------------
 
 @app.post("/saved-searches", status_code=201)
-def create_saved_search(payload: SavedSearch):
-    ss_id = create_document(collection_name(SavedSearch), payload)
-    return {"id": ss_id, **payload.model_dump()}
+async def create_saved_search(payload: SavedSearch):
+    data = payload.model_dump(mode="json")
+    ss_id = await create_document(SAVED_SEARCH_COLL, data)
+    return MongoJSONResponse({"id": ss_id, **data}, status_code=201)
 
 
 @app.get("/saved-searches")
-def list_saved_searches(tenant_id: str):
-    docs = get_documents(collection_name(SavedSearch), {"tenant_id": tenant_id})
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-    return docs
+async def list_saved_searches(
+    tenant_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0),
+):
+    cursor = find_documents(SAVED_SEARCH_COLL, {"tenant_id": tenant_id}, limit=limit, skip=skip, use_aggregate=True)
+    return await streamed_page(cursor, skip)
 
 
 # -----------------------------
@@ -273,25 +543,40 @@ def list_saved_searches(tenant_id: str):
 # -----------------------------
 
 @app.post("/verification", status_code=201)
-def create_verification_request(req: VerificationRequest):
-    v_id = create_document(collection_name(VerificationRequest), req)
-    return {"id": v_id, **req.model_dump()}
+async def create_verification_request(req: VerificationRequest):
+    data = req.model_dump(mode="json")
+    v_id = await create_document(VERIFICATION_COLL, data)
+    return MongoJSONResponse({"id": v_id, **data}, status_code=201)
 
 
 @app.get("/verification")
-def list_verification_requests(user_id: Optional[str] = None, status: Optional[str] = None):
+async def list_verification_requests(
+    user_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0),
+):
     filt = {}
     if user_id:
         filt["user_id"] = user_id
     if status:
         filt["status"] = status
-    docs = get_documents(collection_name(VerificationRequest), filt)
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-    return docs
+    cursor = find_documents(VERIFICATION_COLL, filt, limit=limit, skip=skip, use_aggregate=True)
+    return await streamed_page(cursor, skip)
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # Multiple workers need an import string. In production prefer
+    # gunicorn -k uvicorn.workers.UvicornWorker main:app
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        access_log=False,
+    )
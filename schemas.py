@@ -7,7 +7,7 @@ lowercase class name (e.g., User -> "user").
 These schemas are used for validation in API endpoints and by the database viewer.
 """
 
-from pydantic import BaseModel, Field, EmailStr, HttpUrl, conlist
+from pydantic import BaseModel, Field, EmailStr, HttpUrl, conlist, computed_field
 from typing import List, Optional, Literal
 from datetime import date
 
@@ -26,6 +26,12 @@ class Location(BaseModel):
     state: Optional[str] = None
     country: Optional[str] = None
 
+    @computed_field
+    @property
+    def point(self) -> dict:
+        """GeoJSON point stored alongside lat/lng for the 2dsphere index"""
+        return {"type": "Point", "coordinates": [self.lng, self.lat]}
+
 class User(BaseModel):
     name: str
     email: EmailStr
@@ -67,6 +73,12 @@ class Message(BaseModel):
     content: str
     read: bool = False
 
+    @computed_field
+    @property
+    def participants(self) -> List[str]:
+        """Sender and receiver, stored for single-index "my messages" lookups"""
+        return [self.sender_id, self.receiver_id]
+
 class Review(BaseModel):
     booking_id: str
     reviewer_id: str
@@ -0,0 +1,130 @@
+"""Tests for the pure query builders: listing filters and the id pipeline."""
+
+import pytest
+
+from database import DEFAULT_SORT, DISTANCE_FIELD, _id_pipeline
+from main import (
+    LIST_PROJECTION,
+    LISTING_FILTER_BUILDERS,
+    _AVAILABLE_NOW,
+    _NEAR,
+    _PRICE_MAX,
+    _PRICE_MIN,
+    _ROOM_TYPE,
+)
+
+PARAMS = {
+    "price_min": 100.0,
+    "price_max": 500.0,
+    "room_type": "private_room",
+    "available_now": True,
+    "lat": 51.5,
+    "lng": -0.12,
+    "radius_km": 2.0,
+}
+
+NEAR_FILTER = {
+    "$nearSphere": {
+        "$geometry": {"type": "Point", "coordinates": [-0.12, 51.5]},
+        "$maxDistance": 2000.0,
+    }
+}
+
+
+# -----------------------------
+# Listing filter builders
+# -----------------------------
+
+def test_no_params_builds_empty_filter():
+    assert LISTING_FILTER_BUILDERS[0](PARAMS) == {}
+
+
+@pytest.mark.parametrize(
+    "mask, expected",
+    [
+        (_PRICE_MIN, {"price": {"$gte": 100.0}}),
+        (_PRICE_MAX, {"price": {"$lte": 500.0}}),
+        (_PRICE_MIN | _PRICE_MAX, {"price": {"$gte": 100.0, "$lte": 500.0}}),
+        (_ROOM_TYPE, {"room_type": "private_room"}),
+        (_AVAILABLE_NOW, {"available_now": True}),
+        (_NEAR, {"location.point": NEAR_FILTER}),
+        (
+            _PRICE_MAX | _ROOM_TYPE | _NEAR,
+            {"price": {"$lte": 500.0}, "room_type": "private_room", "location.point": NEAR_FILTER},
+        ),
+    ],
+)
+def test_representative_masks(mask, expected):
+    assert LISTING_FILTER_BUILDERS[mask](PARAMS) == expected
+
+
+@pytest.mark.parametrize("mask", range(32))
+def test_every_mask_sets_exactly_its_fields(mask):
+    expected_keys = set()
+    if mask & (_PRICE_MIN | _PRICE_MAX):
+        expected_keys.add("price")
+    if mask & _ROOM_TYPE:
+        expected_keys.add("room_type")
+    if mask & _AVAILABLE_NOW:
+        expected_keys.add("available_now")
+    if mask & _NEAR:
+        expected_keys.add("location.point")
+    assert set(LISTING_FILTER_BUILDERS[mask](PARAMS)) == expected_keys
+
+
+def test_builders_return_fresh_dicts():
+    first = LISTING_FILTER_BUILDERS[_ROOM_TYPE](PARAMS)
+    first["extra"] = 1
+    assert LISTING_FILTER_BUILDERS[_ROOM_TYPE](PARAMS) == {"room_type": "private_room"}
+
+
+# -----------------------------
+# Aggregate id pipeline
+# -----------------------------
+
+def test_pipeline_defaults():
+    assert _id_pipeline({"role": "tenant"}, None, 0, None, None) == [
+        {"$match": {"role": "tenant"}},
+        {"$sort": dict(DEFAULT_SORT)},
+        {"$addFields": {"id": {"$toString": "$_id"}}},
+        {"$project": {"_id": 0}},
+    ]
+
+
+def test_pipeline_paging_and_explicit_sort():
+    pipeline = _id_pipeline(None, 50, 100, None, [("price", -1)])
+    assert pipeline[:4] == [
+        {"$match": {}},
+        {"$sort": {"price": -1}},
+        {"$skip": 100},
+        {"$limit": 50},
+    ]
+
+
+def test_pipeline_exclusion_projection():
+    pipeline = _id_pipeline({}, 10, 0, LIST_PROJECTION, None)
+    assert pipeline[-1] == {"$project": {"description": 0, "photos": 0, "_id": 0}}
+
+
+def test_pipeline_inclusion_projection_keeps_id():
+    pipeline = _id_pipeline({}, 10, 0, {"title": 1, "price": 1}, None)
+    assert pipeline[-2] == {"$addFields": {"id": {"$toString": "$_id"}}}
+    assert pipeline[-1] == {"$project": {"title": 1, "price": 1, "_id": 0, "id": 1}}
+
+
+def test_pipeline_turns_near_sphere_into_leading_geo_near():
+    filt = LISTING_FILTER_BUILDERS[_ROOM_TYPE | _NEAR](PARAMS)
+    pipeline = _id_pipeline(filt, 50, 0, None, None)
+    assert pipeline[0] == {
+        "$geoNear": {
+            "near": {"type": "Point", "coordinates": [-0.12, 51.5]},
+            "key": "location.point",
+            "distanceField": DISTANCE_FIELD,
+            "spherical": True,
+            "query": {"room_type": "private_room"},
+            "maxDistance": 2000.0,
+        }
+    }
+    # Nearest first, with _id breaking ties for stable paging
+    assert list(pipeline[1]["$sort"].items()) == [(DISTANCE_FIELD, 1), ("_id", 1)]
+    assert not any("$match" in stage for stage in pipeline)